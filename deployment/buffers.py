@@ -0,0 +1,99 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+Bucket = Tuple[int, int, int]
+
+
+@dataclass
+class BufferSet:
+    bucket: Bucket
+    inputs: np.ndarray
+    outputs: np.ndarray
+
+
+class BufferPool:
+    def __init__(
+        self, buckets: Iterable[Bucket], per_bucket: int = 1, channels: int = 3
+    ):
+        self.channels = channels
+        self.per_bucket = per_bucket
+
+        self._lock = threading.Lock()
+        self._free: Dict[Bucket, List[BufferSet]] = {}
+        self._stats = {
+            "allocations": 0,
+            "acquisitions": 0,
+            "misses": 0,
+            "in_use": 0,
+            "peak_in_use": 0,
+        }
+
+        for bucket in buckets:
+            self._free[bucket] = [self._allocate(bucket) for _ in range(per_bucket)]
+
+    def _allocate(self, bucket: Bucket) -> BufferSet:
+        shape = (*bucket, self.channels)
+        self._stats["allocations"] += 1
+
+        return BufferSet(
+            bucket=bucket,
+            inputs=np.empty(shape, dtype=np.float32),
+            outputs=np.empty(shape, dtype=np.uint8),
+        )
+
+    def acquire(self, bucket: Bucket) -> BufferSet:
+        """
+        Takes a buffer set from the pool, allocating one if the bucket is
+        exhausted or unknown
+
+        Args:
+            bucket (Bucket): The (batch_size, height, width) bucket
+
+        Returns:
+            BufferSet: Input and output arrays of the bucket shape
+        """
+
+        with self._lock:
+            self._stats["acquisitions"] += 1
+            self._stats["in_use"] += 1
+            self._stats["peak_in_use"] = max(
+                self._stats["peak_in_use"], self._stats["in_use"]
+            )
+
+            free = self._free.get(bucket)
+            if free:
+                return free.pop()
+
+            self._stats["misses"] += 1
+            return self._allocate(bucket)
+
+    def release(self, buffers: BufferSet) -> None:
+        """Returns a buffer set to the pool, dropping it if the pool is full"""
+
+        with self._lock:
+            self._stats["in_use"] -= 1
+
+            free = self._free.get(buffers.bucket)
+            if free is not None and len(free) < self.per_bucket:
+                free.append(buffers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            capacity = self.per_bucket * len(self._free)
+            free = sum(len(buffers) for buffers in self._free.values())
+            # float32 inputs plus uint8 outputs for every pooled set
+            pooled_bytes = sum(
+                int(np.prod(bucket)) * self.channels * 5 * self.per_bucket
+                for bucket in self._free
+            )
+
+            return {
+                **self._stats,
+                "capacity": capacity,
+                "free": free,
+                "utilization": 1 - free / capacity if capacity else 0.0,
+                "pooled_bytes": pooled_bytes,
+                "buckets": [list(bucket) for bucket in sorted(self._free)],
+            }
@@ -2,10 +2,16 @@ import tensorflow as tf
 import numpy as np
 import io
 import gc
+import os
+import json
+import asyncio
+import time
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from PIL import Image
+from buffers import BufferPool
+from jobs import JobQueue, QueueFullError, ResultStore
 
 app = FastAPI(title="Monet Style GAN")
 
@@ -22,9 +28,44 @@ tf.config.set_soft_device_placement(True)
 tf.config.threading.set_intra_op_parallelism_threads(1)
 tf.config.threading.set_inter_op_parallelism_threads(1)
 
+# "bfloat16" lets grappler rewrite the loaded graph to run its convolutions in
+# bfloat16 (oneDNN). Only worth it on CPUs with AVX512-BF16 or AMX, elsewhere
+# bfloat16 is emulated; measure with `benchmark_precision.py --saved-model`
+MODEL_PRECISION = os.environ.get("MODEL_PRECISION", "float32")
+
+if MODEL_PRECISION not in ("float32", "bfloat16"):
+    raise ValueError(
+        f"Unsupported MODEL_PRECISION '{MODEL_PRECISION}', "
+        "expected 'float32' or 'bfloat16'"
+    )
+
+if MODEL_PRECISION == "bfloat16":
+    tf.config.optimizer.set_experimental_options(
+        {"auto_mixed_precision_onednn_bfloat16": True}
+    )
+
+print(f"Serving precision: {MODEL_PRECISION}")
+
+
+def parse_buckets(value: str) -> list:
+    return sorted({int(size) for size in value.split(",") if size.strip()})
+
+
+# Every upload is resized to this square resolution before inference
+SERVING_RESOLUTION = 256
+SERVING_SIZE = (SERVING_RESOLUTION, SERVING_RESOLUTION)
+SERVING_BUCKET = (1, SERVING_RESOLUTION, SERVING_RESOLUTION)
+
+# Batch sizes traced and warmed up at the serving resolution before the
+# server reports ready. Requests carry a single image, so only batch size 1
+# is traced unless configured
+BATCH_BUCKETS = parse_buckets(os.environ.get("BATCH_BUCKETS", "1"))
+WARMUP_RUNS = int(os.environ.get("WARMUP_RUNS", 2))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+
 
 class Generator:
-    def __init__(self):
+    def __init__(self, model_path="monet_generator/saved_model"):
         try:
             tf.config.experimental.set_memory_growth(
                 tf.config.experimental.list_physical_devices("GPU")[0], True
@@ -33,65 +74,321 @@ class Generator:
         except:
             pass
 
-        self.model = tf.saved_model.load("monet_generator/saved_model")
+        self.model = tf.saved_model.load(model_path)
         self.serve_fn = self.model.signatures["serving_default"]
 
+        self.input_name, self.input_spec = list(
+            self.serve_fn.structured_input_signature[1].items()
+        )[0]
+        self.output_name = list(self.serve_fn.structured_outputs.keys())[0]
+
+        self._predict = tf.function(self._serve)
+        self.concrete_fns = {}
+
+    def _serve(self, inputs):
+        inputs = tf.cast(inputs, self.input_spec.dtype)
+        result = self.serve_fn(**{self.input_name: inputs})
+
+        return tf.cast(result[self.output_name], tf.float32)
+
+    def trace(self, batch_size: int, resolution: int) -> bool:
+        """
+        Traces the concrete function of a batch size and resolution bucket
+
+        Args:
+            batch_size (int): Bucket batch size
+            resolution (int): Bucket height and width
+
+        Returns:
+            bool: False if the model signature does not accept the bucket shape
+        """
+
+        spec = tf.TensorSpec(
+            [batch_size, resolution, resolution, self.input_spec.shape[-1]],
+            tf.float32,
+        )
+
+        if not self.input_spec.shape.is_compatible_with(spec.shape):
+            return False
+
+        self.concrete_fns[(batch_size, resolution, resolution)] = (
+            self._predict.get_concrete_function(spec)
+        )
+        return True
+
+    def _bucket(self, batch_size: int, height: int, width: int):
+        candidates = [
+            bucket
+            for bucket in self.concrete_fns
+            if bucket[1:] == (height, width) and bucket[0] >= batch_size
+        ]
+
+        return min(candidates) if candidates else None
+
     def __call__(self, inputs, training=None):
-        input_name = list(self.serve_fn.structured_input_signature[1].keys())[0]
-        inputs = tf.cast(inputs, tf.float32)
-        result = self.serve_fn(**{input_name: inputs})
+        inputs = tf.convert_to_tensor(inputs, tf.float32)
+        batch_size, height, width = inputs.shape[:3]
+        bucket = self._bucket(batch_size, height, width)
+
+        if bucket is None:
+            # Shape outside of the pre-traced buckets, traced on demand
+            return self._predict(inputs)
+
+        # Pad up to the bucket batch size to reuse its traced function
+        padding = bucket[0] - batch_size
+        if padding:
+            inputs = tf.pad(inputs, [[0, padding], [0, 0], [0, 0], [0, 0]])
+
+        return self.concrete_fns[bucket](inputs)[:batch_size]
+
+
+class StartupState:
+    def __init__(self):
+        self.ready = False
+        self.error = None
+        self.timings = {}
+        self.task = None
+        self._event = None
+
+    def event(self) -> asyncio.Event:
+        # Created lazily so it belongs to the server's event loop
+        if self._event is None:
+            self._event = asyncio.Event()
+
+        return self._event
+
+    async def wait_ready(self) -> None:
+        await self.event().wait()
+
+        if self.error:
+            raise RuntimeError(f"Model failed to load: {self.error}")
+
+
+generator = None
+buffer_pool = None
+startup_state = StartupState()
+
+
+def load_and_warm_up() -> Generator:
+    """
+    Loads the model, traces the bucket shapes, preallocates their buffers
+    and runs warm-up inferences
+
+    Returns:
+        Generator: The warmed up generator
+    """
 
-        output_name = list(result.keys())[0]
-        return result[output_name]
+    global buffer_pool
 
+    start = time.perf_counter()
+    model = Generator()
+    startup_state.timings["load_seconds"] = time.perf_counter() - start
+    print(f"Model loaded in {startup_state.timings['load_seconds']:.2f}s")
 
-try:
-    generator = Generator()
+    start = time.perf_counter()
+    for batch_size in BATCH_BUCKETS:
+        if not model.trace(batch_size, SERVING_RESOLUTION):
+            print(
+                f"Skipping bucket {batch_size}x{SERVING_RESOLUTION}: "
+                f"incompatible with model input {model.input_spec.shape}"
+            )
+    startup_state.timings["trace_seconds"] = time.perf_counter() - start
+
+    # Without a traced bucket the first request would retrace, the very
+    # latency spike the warm-up exists to avoid
+    if not model.concrete_fns:
+        raise RuntimeError(
+            f"No batch bucket in {BATCH_BUCKETS} fits model input "
+            f"{model.input_spec.shape} at {SERVING_RESOLUTION}x{SERVING_RESOLUTION}"
+        )
+    print(
+        f"Traced {len(model.concrete_fns)} buckets in "
+        f"{startup_state.timings['trace_seconds']:.2f}s"
+    )
+
+    # Requests carry a single serving-size image, so one buffer set per
+    # worker of exactly that shape keeps the pool allocation-free under
+    # sustained load; the generator pads it up when batch 1 is not traced
+    buffer_pool = BufferPool([SERVING_BUCKET], per_bucket=JOB_WORKERS)
+    print(f"Preallocated buffers: {buffer_pool.stats()}")
+
+    start = time.perf_counter()
+    for batch_size, height, width in model.concrete_fns:
+        warmup_input = tf.zeros([batch_size, height, width, 3], tf.float32)
+
+        for _ in range(WARMUP_RUNS):
+            model(warmup_input).numpy()
+    startup_state.timings["warmup_seconds"] = time.perf_counter() - start
+    print(
+        f"Ran {WARMUP_RUNS} warm-up inferences per bucket in "
+        f"{startup_state.timings['warmup_seconds']:.2f}s"
+    )
+
+    return model
+
+
+async def start_model():
+    global generator
+
+    start = time.perf_counter()
+
+    try:
+        generator = await asyncio.to_thread(load_and_warm_up)
+        startup_state.ready = True
 
-except Exception as e:
-    raise Exception(f"Error loading model: {str(e)}")
+    except Exception as e:
+        startup_state.error = str(e)
+        print(f"Error loading model: {str(e)}")
+
+    finally:
+        startup_state.timings["total_seconds"] = time.perf_counter() - start
+        print(f"Startup finished in {startup_state.timings['total_seconds']:.2f}s")
+
+        # Long-lived startup objects are moved out of the collector's reach
+        # so later collections stay short
+        gc.collect()
+        gc.freeze()
+        startup_state.event().set()
 
 
-def process_image(image: Image.Image, target_size=(256, 256)) -> tf.Tensor:
+def process_image(image: Image.Image, out: np.ndarray, target_size=SERVING_SIZE):
     """
-    Processes the image to be compatible with the model
+    Processes the image to be compatible with the model, writing it into a
+    preallocated input buffer
 
     Args:
         image (PIL.Image.Image): Input image
+        out (np.ndarray): float32 buffer of shape (height, width, channels)
         target_size (tuple): Target size for the image
+    """
+
+    image = image.resize(target_size)
+
+    # PIL only exposes its pixels through a fresh array, so this is the one
+    # per-request uint8 copy left; it is target-sized, never upload-sized
+    np.copyto(out, np.asarray(image), casting="unsafe")
+    np.multiply(out, 1 / 127.5, out=out)
+    np.subtract(out, 1, out=out)
+
+
+def postprocess_image(
+    generated_img: tf.Tensor, scratch: np.ndarray, out: np.ndarray
+) -> bytes:
+    """
+    Postprocesses the generated image to be compatible with the API, going
+    through preallocated buffers
+
+    Args:
+        generated_img (tf.Tensor): Generated image batch
+        scratch (np.ndarray): float32 buffer of the batch shape
+        out (np.ndarray): uint8 buffer of the batch shape
 
     Returns:
-        tf.Tensor: Processed image
+        bytes: Processed image
     """
 
-    try:
-        image = image.resize(target_size)
-        img_array = tf.keras.preprocessing.image.img_to_array(image)
-        img_array = (img_array / 127.5) - 1
+    # numpy() views the CPU tensor memory, so no copy is made here
+    np.add(generated_img.numpy(), 1, out=scratch)
+    np.multiply(scratch, 127.5, out=scratch)
+    np.clip(scratch, 0, 255, out=scratch)
+    np.copyto(out, scratch, casting="unsafe")
 
-        return tf.expand_dims(img_array, 0)
+    img_byte_arr = io.BytesIO()
+    Image.fromarray(out[0]).save(img_byte_arr, format="JPEG")
 
-    finally:
-        gc.collet()
+    return img_byte_arr.getvalue()
 
 
-def postprocess_image(generated_img: tf.Tensor) -> bytes:
+def stylize(contents: bytes) -> bytes:
     """
-    Postprocesses the generated image to be compatible with the API
+    Runs the full decode, inference and encode pipeline on an upload
 
     Args:
-        generated_img (tf.Tensor): Generated image
+        contents (bytes): Uploaded image
 
     Returns:
-        bytes: Processed image
+        bytes: Transformed JPEG image
     """
+
+    buffers = buffer_pool.acquire(SERVING_BUCKET)
+    inputs, outputs = buffers.inputs, buffers.outputs
+
     try:
-        img_array = ((generated_img[0] + 1) * 127.5).numpy().astype(np.uint8)
-        img_byte_arr = io.BytesIO()
+        with Image.open(io.BytesIO(contents)) as img:
+            # Lets JPEG decoding downscale large uploads up front
+            img.draft("RGB", SERVING_SIZE)
+            process_image(img.convert("RGB"), inputs[0], SERVING_SIZE)
+
+        # The input buffer is free once inference is done, so it doubles as
+        # the float scratch space of the postprocessing
+        generated_img = generator(inputs)
+
+        return postprocess_image(generated_img, inputs, outputs)
 
-        return img_byte_arr.getvalue()
     finally:
-        gc.collect()
+        buffer_pool.release(buffers)
+
+
+async def run_job(contents: bytes) -> bytes:
+    # Jobs accepted during startup wait for the warmed up model
+    await startup_state.wait_ready()
+
+    # Inference runs off the event loop so polling stays responsive
+    return await asyncio.to_thread(stylize, contents)
+
+
+job_queue = JobQueue(
+    run_job,
+    ResultStore(
+        os.environ.get("RESULT_DIR", "/tmp/monet_results"),
+        ttl=float(os.environ.get("RESULT_TTL_SECONDS", 900)),
+    ),
+    max_size=int(os.environ.get("JOB_QUEUE_SIZE", 32)),
+    workers=JOB_WORKERS,
+)
+
+
+@app.on_event("startup")
+async def start_job_queue():
+    # The model loads in the background so liveness checks answer meanwhile
+    startup_state.event()
+    startup_state.task = asyncio.create_task(start_model())
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    if startup_state.task is not None:
+        startup_state.task.cancel()
+
+    await job_queue.stop()
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(400, "File provided is not an image")
+
+    return await file.read()
+
+
+def submit_job(contents: bytes, priority: str, store_result: bool = True):
+    try:
+        return job_queue.submit(contents, priority, store_result)
+
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    except QueueFullError as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": "5"})
+
+
+def get_job_or_404(job_id: str):
+    job = job_queue.get(job_id)
+
+    if job is None:
+        raise HTTPException(404, f"Job {job_id} not found or expired")
+
+    return job
 
 
 @app.post("/transform/")
@@ -106,47 +403,190 @@ async def transform_image(file: UploadFile = File(...)) -> Response:
         Response: Transformed image
 
     Raises:
+        HTTPException: If the model is not ready yet
         HTTPException: If the file provided is not an image
+        HTTPException: If the job queue is full
         HTTPException: If there is an error processing the image
     """
 
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(400, "File provided is not an image")
+    if not startup_state.ready:
+        raise HTTPException(503, "Model is not ready", headers={"Retry-After": "5"})
 
-    try:
-        contents = await file.read()
-        img = Image.open(io.BytesIO(contents)).convert("RGB")
+    contents = await read_upload(file)
 
-        processed_img = process_image(img)
-        del img
-        gc.collect()
+    # Synchronous callers share the worker queue ahead of background jobs;
+    # their result comes back in memory, bypassing the result store
+    job = await job_queue.wait(submit_job(contents, "high", store_result=False))
+    job_queue.discard(job.id)
 
-        generated_img = generator(processed_img)
-        del processed_img
-        gc.collect()
+    if job.status == "failed":
+        print(f"Error: {job.error}")
+        raise HTTPException(500, f"Error processing image: {job.error}")
 
-        img_bytes = postprocess_image(generated_img)
-        del generated_img
-        gc.collect()
+    img_bytes = job.result
 
-        return Response(
-            content=img_bytes,
-            media_type="image/jpeg",
-            headers={"Content-Length": str(len(img_bytes))},
-        )
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        raise HTTPException(500, f"Error processing image: {str(e)}")
+    return Response(
+        content=img_bytes,
+        media_type="image/jpeg",
+        headers={"Content-Length": str(len(img_bytes))},
+    )
+
+
+@app.post("/jobs/", status_code=202)
+async def create_job(file: UploadFile = File(...), priority: str = "normal"):
+    """
+    Queues the input image for Monet-style transformation
+
+    Args:
+        file (UploadFile, required): Input image
+        priority (str): Priority class, one of "high", "normal" or "low"
+
+    Returns:
+        dict: The job identifier and status
+
+    Raises:
+        HTTPException: If the file provided is not an image
+        HTTPException: If the priority is unknown
+        HTTPException: If the job queue is full
+    """
+
+    contents = await read_upload(file)
+    job = submit_job(contents, priority)
+
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Returns the status of a job
+
+    Raises:
+        HTTPException: If the job does not exist or expired
+    """
+
+    return get_job_or_404(job_id).to_dict()
 
-    finally:
-        gc.collect()
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> Response:
+    """
+    Returns the transformed image of a completed job
+
+    Raises:
+        HTTPException: If the job does not exist or expired
+        HTTPException: If the job failed
+        HTTPException: If the job has not completed yet
+    """
+
+    job = get_job_or_404(job_id)
+
+    if job.status == "failed":
+        raise HTTPException(500, f"Error processing image: {job.error}")
+
+    img_bytes = None
+    if job.status == "completed":
+        img_bytes = await job_queue.read_result(job)
+
+    if img_bytes is None:
+        raise HTTPException(409, f"Job {job_id} is {job.status}")
+
+    return Response(
+        content=img_bytes,
+        media_type="image/jpeg",
+        headers={"Content-Length": str(len(img_bytes))},
+    )
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str) -> StreamingResponse:
+    """
+    Streams the status changes of a job as server-sent events until it
+    completes or fails
+
+    Raises:
+        HTTPException: If the job does not exist or expired
+    """
+
+    job = get_job_or_404(job_id)
+
+    async def events():
+        while True:
+            # Decide on the snapshot that was sent, so the terminal status is
+            # always delivered even if the job finishes mid-send
+            state = job.to_dict()
+            yield f"data: {json.dumps(state)}\n\n"
+
+            if state["status"] in ("completed", "failed"):
+                break
+
+            if job.status != state["status"]:
+                continue
+
+            # Periodic keep-alive so proxies do not drop idle streams
+            await job_queue.wait_for_change(job, timeout=15)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @app.get("/health")
 async def health_check():
+    """
+    Liveness check, fails once the model failed to load so the instance
+    gets restarted
+
+    Raises:
+        HTTPException: If the model failed to load
+    """
+
+    if startup_state.error:
+        raise HTTPException(
+            503, {"status": "unhealthy", "error": startup_state.error}
+        )
+
     return {"status": "healthy", "message": "Service is up and running"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Reports whether the model is loaded, traced and warmed up
+
+    Raises:
+        HTTPException: If the model is still starting or failed to load
+    """
+
+    if not startup_state.ready:
+        status = "failed" if startup_state.error else "starting"
+        raise HTTPException(
+            503,
+            {
+                "status": status,
+                "error": startup_state.error,
+                "timings": startup_state.timings,
+            },
+        )
+
+    return {
+        "status": "ready",
+        "buckets": [list(bucket) for bucket in sorted(generator.concrete_fns)],
+        "timings": startup_state.timings,
+    }
+
+
+@app.get("/stats")
+async def stats():
+    """
+    Reports the buffer pool utilization and allocation counts and the job
+    queue state
+    """
+
+    return {
+        "buffers": buffer_pool.stats() if buffer_pool else None,
+        "jobs": job_queue.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -155,7 +595,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         workers=1,
-        limit_concurrency=1,
+        limit_concurrency=64,
         timeout_keep_alive=60,
         loop="asyncio",
     )
@@ -0,0 +1,288 @@
+import asyncio
+import itertools
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+@dataclass
+class Job:
+    id: str
+    payload: bytes
+    priority: str = "normal"
+    status: str = "queued"
+    error: Optional[str] = None
+    # Synchronous jobs hand their result back in memory instead of the store
+    store_result: bool = True
+    result: Optional[bytes] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ResultStore:
+    def __init__(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.jpg")
+
+    def put(self, job_id: str, content: bytes) -> None:
+        """
+        Stores the result of a job
+
+        Args:
+            job_id (str): Job identifier
+            content (bytes): Encoded result image
+        """
+
+        tmp_path = self._path(job_id) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+
+        os.replace(tmp_path, self._path(job_id))
+
+    def get(self, job_id: str) -> Optional[bytes]:
+        """
+        Reads the result of a job
+
+        Args:
+            job_id (str): Job identifier
+
+        Returns:
+            Optional[bytes]: Encoded result image, None if missing or expired
+        """
+
+        try:
+            with open(self._path(job_id), "rb") as f:
+                return f.read()
+
+        except FileNotFoundError:
+            return None
+
+    def delete(self, job_id: str) -> None:
+        try:
+            os.remove(self._path(job_id))
+
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self) -> list:
+        """
+        Removes the results older than the TTL
+
+        Returns:
+            list: Identifiers of the expired jobs
+        """
+
+        expired = []
+        now = time.time()
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+                    expired.append(name.split(".")[0])
+
+            except FileNotFoundError:
+                pass
+
+        return expired
+
+
+class JobQueue:
+    def __init__(
+        self,
+        handler: Callable[[bytes], Awaitable[bytes]],
+        store: ResultStore,
+        max_size: int = 32,
+        workers: int = 1,
+        cleanup_interval: float = 60.0,
+    ):
+        self.handler = handler
+        self.store = store
+        self.max_size = max_size
+        self.workers = workers
+        self.cleanup_interval = cleanup_interval
+
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._counter = itertools.count()
+        self._tasks = []
+
+    async def start(self) -> None:
+        """Starts the workers and the result cleanup loop"""
+
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(
+        self, payload: bytes, priority: str = "normal", store_result: bool = True
+    ) -> Job:
+        """
+        Enqueues a new job
+
+        Args:
+            payload (bytes): Uploaded image
+            priority (str): One of PRIORITIES
+            store_result (bool): Whether to keep the result in the store,
+                otherwise it is kept on the job until discarded
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            ValueError: If the priority is unknown
+            QueueFullError: If the queue is at capacity
+        """
+
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}"
+            )
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            payload=payload,
+            priority=priority,
+            store_result=store_result,
+        )
+
+        try:
+            # The counter keeps FIFO order within a priority class
+            self._queue.put_nowait((PRIORITIES[priority], next(self._counter), job))
+
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full")
+
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def discard(self, job_id: str) -> None:
+        """Forgets a finished job that is not fetched again"""
+
+        self.jobs.pop(job_id, None)
+
+    async def read_result(self, job: Job) -> Optional[bytes]:
+        """Reads the stored result of a job off the event loop"""
+
+        if job.result is not None:
+            return job.result
+
+        return await asyncio.to_thread(self.store.get, job.id)
+
+    async def wait(self, job: Job) -> Job:
+        """Waits until the job completes or fails"""
+
+        while not job.done:
+            await self.wait_for_change(job)
+
+        return job
+
+    async def wait_for_change(self, job: Job, timeout: float = None) -> None:
+        try:
+            await asyncio.wait_for(job.changed.wait(), timeout)
+
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+
+        return {
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "max_size": self.max_size,
+            "workers": self.workers,
+            "jobs": counts,
+        }
+
+    def _update(self, job: Job, status: str) -> None:
+        job.status = status
+        job.changed.set()
+        job.changed = asyncio.Event()
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+
+            job.started_at = time.time()
+            self._update(job, "running")
+
+            try:
+                result = await self.handler(job.payload)
+
+                if job.store_result:
+                    await asyncio.to_thread(self.store.put, job.id, result)
+
+                else:
+                    job.result = result
+
+                status = "completed"
+
+            except Exception as e:
+                job.error = str(e)
+                status = "failed"
+
+            finally:
+                job.payload = b""
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+            self._update(job, status)
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+
+            for job_id in await asyncio.to_thread(self.store.cleanup):
+                self.jobs.pop(job_id, None)
+
+            # Failed jobs have no stored result, expire their metadata too
+            now = time.time()
+            for job_id, job in list(self.jobs.items()):
+                if job.done and now - job.finished_at > self.store.ttl:
+                    self.jobs.pop(job_id, None)
+                    await asyncio.to_thread(self.store.delete, job_id)
@@ -0,0 +1,285 @@
+import argparse
+import multiprocessing
+import time
+import tensorflow as tf
+from dataclasses import replace
+from pathlib import Path
+from config import ModelConfig
+from data_pipeline.processor import ImageProcessor
+from models.generator import Generator
+
+
+def load_batches(
+    config: ModelConfig, data_dir: str, batch_size: int, num_batches: int
+) -> list:
+    """
+    Loads evaluation batches from the photo TFRecords, falling back to random
+    images in [-1, 1] when no records are available.
+
+    Args:
+      config: ModelConfig - The model configuration.
+      data_dir: str - Directory holding `photo_tfrec/*.tfrec`.
+      batch_size: int - Number of images per batch.
+      num_batches: int - Number of batches to load.
+
+    Returns:
+      list - The evaluation batches.
+    """
+
+    photo_files = tf.io.gfile.glob(str(Path(data_dir) / "photo_tfrec" / "*.tfrec"))
+
+    if photo_files:
+        processor = ImageProcessor(config)
+        dataset = processor.create_dataset(
+            photo_files, batch_size=batch_size, shuffle=False, cache=False
+        )
+        return list(dataset.take(num_batches))
+
+    shape = (batch_size, config.height, config.width, config.channels)
+    return [
+        tf.random.uniform(shape, minval=-1.0, maxval=1.0, seed=i)
+        for i in range(num_batches)
+    ]
+
+
+def measure_throughput(predict, batches: list, repeats: int) -> float:
+    """
+    Measures the inference throughput of a prediction function.
+
+    Args:
+      predict: Callable mapping an input batch to the generated batch.
+      batches: list - The input batches.
+      repeats: int - Number of passes over the batches.
+
+    Returns:
+      float - Images per second.
+    """
+
+    # Trace and warm up kernels outside of the timed region
+    predict(batches[0]).numpy()
+
+    images = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for batch in batches:
+            predict(batch).numpy()
+            images += int(batch.shape[0])
+
+    return images / (time.perf_counter() - start)
+
+
+def drift_report(expected: list, actual: list) -> dict:
+    """
+    Summarizes how far the candidate outputs drift from the reference ones.
+
+    Args:
+      expected: list - Reference output batches in [-1, 1].
+      actual: list - Candidate output batches in [-1, 1].
+
+    Returns:
+      dict - Mean and max absolute error and mean PSNR.
+    """
+
+    abs_errors = tf.concat(
+        [tf.reshape(tf.abs(e - a), [-1]) for e, a in zip(expected, actual)], axis=0
+    )
+    psnrs = tf.concat(
+        [
+            tf.image.psnr(e + 1.0, a + 1.0, max_val=2.0)
+            for e, a in zip(expected, actual)
+        ],
+        axis=0,
+    )
+
+    return {
+        "mean_abs_error": float(tf.reduce_mean(abs_errors)),
+        "max_abs_error": float(tf.reduce_max(abs_errors)),
+        "mean_psnr_db": float(tf.reduce_mean(psnrs)),
+    }
+
+
+def compare_precisions(
+    data_dir: str,
+    precision: str = "mixed_bfloat16",
+    weights: str = None,
+    batch_size: int = 4,
+    num_batches: int = 8,
+    repeats: int = 3,
+) -> dict:
+    """
+    Compares a generator running with the `precision` Keras policy against a
+    float32 reference sharing the same weights.
+
+    Args:
+      data_dir: str - Directory holding `photo_tfrec/*.tfrec`.
+      precision: str - The precision policy to evaluate.
+      weights: str - Optional generator weights to load.
+      batch_size: int - Number of images per batch.
+      num_batches: int - Number of batches to evaluate.
+      repeats: int - Number of timed passes over the batches.
+
+    Returns:
+      dict - Accuracy drift and throughput of both precisions.
+    """
+
+    reference_config = ModelConfig(precision="float32")
+    candidate_config = replace(reference_config, precision=precision)
+
+    batches = load_batches(reference_config, data_dir, batch_size, num_batches)
+
+    reference = Generator(reference_config)
+    candidate = Generator(candidate_config)
+    reference(batches[0], training=False)
+    candidate(batches[0], training=False)
+
+    if weights:
+        reference.load_weights(weights)
+
+    # Mixed policies keep float32 variables, so weights transfer as-is
+    candidate.set_weights(reference.get_weights())
+
+    expected = [reference(batch, training=False) for batch in batches]
+    actual = [candidate(batch, training=False) for batch in batches]
+
+    reference_throughput = measure_throughput(
+        tf.function(lambda x: reference(x, training=False)), batches, repeats
+    )
+    candidate_throughput = measure_throughput(
+        tf.function(lambda x: candidate(x, training=False)), batches, repeats
+    )
+
+    return {
+        "precision": precision,
+        **drift_report(expected, actual),
+        "float32_images_per_sec": reference_throughput,
+        f"{precision}_images_per_sec": candidate_throughput,
+        "speedup": candidate_throughput / reference_throughput,
+    }
+
+
+def run_saved_model(model_path: str, batches: list, bfloat16: bool, repeats: int):
+    """
+    Runs the exported SavedModel the way the inference server does. Meant to
+    run in a fresh process, since grappler options only apply to functions
+    optimized after they are set.
+
+    Args:
+      model_path: str - Path of the SavedModel.
+      batches: list - Input batches as NumPy arrays.
+      bfloat16: bool - Whether to enable oneDNN bfloat16 graph rewriting.
+      repeats: int - Number of timed passes over the batches.
+
+    Returns:
+      Tuple[list, float] - The output batches and the images per second.
+    """
+
+    if bfloat16:
+        tf.config.optimizer.set_experimental_options(
+            {"auto_mixed_precision_onednn_bfloat16": True}
+        )
+
+    serve_fn = tf.saved_model.load(model_path).signatures["serving_default"]
+    input_name, input_spec = list(serve_fn.structured_input_signature[1].items())[0]
+    output_name = list(serve_fn.structured_outputs.keys())[0]
+
+    def predict(inputs):
+        result = serve_fn(**{input_name: tf.cast(inputs, input_spec.dtype)})
+        return tf.cast(result[output_name], tf.float32)
+
+    batches = [tf.constant(batch) for batch in batches]
+    outputs = [predict(batch).numpy() for batch in batches]
+
+    return outputs, measure_throughput(predict, batches, repeats)
+
+
+def compare_saved_model(
+    model_path: str,
+    data_dir: str,
+    batch_size: int = 1,
+    num_batches: int = 8,
+    repeats: int = 3,
+) -> dict:
+    """
+    Compares the exported SavedModel with and without the oneDNN bfloat16
+    grappler rewrite, i.e. the `MODEL_PRECISION` settings of the server.
+
+    Args:
+      model_path: str - Path of the SavedModel.
+      data_dir: str - Directory holding `photo_tfrec/*.tfrec`.
+      batch_size: int - Number of images per batch, must fit the signature.
+      num_batches: int - Number of batches to evaluate.
+      repeats: int - Number of timed passes over the batches.
+
+    Returns:
+      dict - Accuracy drift and throughput of both settings.
+    """
+
+    batches = [
+        batch.numpy()
+        for batch in load_batches(ModelConfig(), data_dir, batch_size, num_batches)
+    ]
+
+    # One fresh process per setting so each one is optimized from scratch
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        expected, reference_throughput = pool.apply(
+            run_saved_model, (model_path, batches, False, repeats)
+        )
+        actual, candidate_throughput = pool.apply(
+            run_saved_model, (model_path, batches, True, repeats)
+        )
+
+    return {
+        "precision": "onednn_bfloat16",
+        **drift_report(
+            [tf.constant(e) for e in expected], [tf.constant(a) for a in actual]
+        ),
+        "float32_images_per_sec": reference_throughput,
+        "onednn_bfloat16_images_per_sec": candidate_throughput,
+        "speedup": candidate_throughput / reference_throughput,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare generator accuracy and throughput against float32"
+    )
+    parser.add_argument("--data-dir", default="../data")
+    parser.add_argument("--precision", default="mixed_bfloat16")
+    parser.add_argument(
+        "--saved-model",
+        default=None,
+        help="benchmark this SavedModel with the server's grappler bfloat16 "
+        "rewrite on and off instead of the Keras precision policy",
+    )
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--num-batches", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.saved_model:
+        report = compare_saved_model(
+            args.saved_model,
+            args.data_dir,
+            batch_size=args.batch_size,
+            num_batches=args.num_batches,
+            repeats=args.repeats,
+        )
+
+    else:
+        report = compare_precisions(
+            args.data_dir,
+            precision=args.precision,
+            weights=args.weights,
+            batch_size=args.batch_size,
+            num_batches=args.num_batches,
+            repeats=args.repeats,
+        )
+
+    for key, value in report.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
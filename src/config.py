@@ -9,4 +9,5 @@ class ModelConfig:
   lambda_cycle: float = 10.0
   lambda_identity: float = 0.5
   learning_rate: float = 2e-4
-  beta_1: float = 0.5
\ No newline at end of file
+  beta_1: float = 0.5
+  precision: str = "float32"  # "float32", "mixed_bfloat16" or "mixed_float16"
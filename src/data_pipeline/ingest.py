@@ -0,0 +1,382 @@
+import argparse
+import io
+import json
+import math
+import os
+import heapq
+import tempfile
+import tensorflow as tf
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+from config import ModelConfig
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+MANIFEST_NAME = "manifest.json"
+
+
+def encode_image(
+    path: str, size: Tuple[int, int], quality: int
+) -> Tuple[str, Optional[bytes], Optional[str]]:
+    """
+    Decodes, resizes and re-encodes an image as JPEG. Runs in worker processes.
+
+    Args:
+      path: str - Path of the source image.
+      size: Tuple[int, int] - Target (width, height).
+      quality: int - JPEG quality.
+
+    Returns:
+      Tuple[str, Optional[bytes], Optional[str]] - The path, the encoded
+      image (None on failure) and the error message (None on success).
+    """
+
+    try:
+        with Image.open(path) as image:
+            image = image.convert("RGB").resize(size, Image.BICUBIC)
+
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=quality)
+
+        return path, buffer.getvalue(), None
+
+    except Exception as e:
+        return path, None, str(e)
+
+
+def serialize_example(image_name: str, image: bytes, target: str) -> bytes:
+    """
+    Serializes an image with the schema read by `ImageProcessor.parse_tfrecord`.
+
+    Args:
+      image_name: str - Name of the image.
+      image: bytes - Encoded image.
+      target: str - Target label of the image.
+
+    Returns:
+      bytes - The serialized tf.train.Example.
+    """
+
+    def bytes_feature(value: bytes) -> tf.train.Feature:
+        return tf.train.Feature(bytes_list=tf.train.BytesList(value=[value]))
+
+    example = tf.train.Example(
+        features=tf.train.Features(
+            feature={
+                "image_name": bytes_feature(image_name.encode()),
+                "image": bytes_feature(image),
+                "target": bytes_feature(target.encode()),
+            }
+        )
+    )
+
+    return example.SerializeToString()
+
+
+def load_manifest(output_dir: Path) -> dict:
+    manifest_path = output_dir / MANIFEST_NAME
+
+    if not manifest_path.exists():
+        return {"shards": {}, "files": {}}
+
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(output_dir: Path, manifest: dict) -> None:
+    tmp_path = output_dir / (MANIFEST_NAME + ".tmp")
+
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.replace(tmp_path, output_dir / MANIFEST_NAME)
+
+
+def prune_missing_shards(output_dir: Path, manifest: dict) -> None:
+    """
+    Drops the manifest entries of shards missing on disk, so their images are
+    ingested again if a previous run stopped before promoting its shards.
+
+    Args:
+      output_dir: Path - Directory holding the shards.
+      manifest: dict - Manifest of the previous runs, updated in place.
+    """
+
+    missing = {
+        shard_name
+        for shard_name in manifest["shards"]
+        if not (output_dir / shard_name).exists()
+    }
+
+    if not missing:
+        return
+
+    print(f"Re-ingesting the images of missing shards: {sorted(missing)}")
+
+    for shard_name in missing:
+        del manifest["shards"][shard_name]
+
+    manifest["files"] = {
+        key: entry
+        for key, entry in manifest["files"].items()
+        if entry["shard"] not in missing
+    }
+
+
+def find_new_images(input_dir: Path, manifest: dict) -> List[Path]:
+    """
+    Lists the images under the input directory that are not in the manifest.
+
+    Args:
+      input_dir: Path - Directory to walk.
+      manifest: dict - Manifest of the previous runs.
+
+    Returns:
+      List[Path] - The images still to be ingested, in a stable order.
+    """
+
+    new_images = []
+
+    for path in sorted(input_dir.rglob("*")):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS or not path.is_file():
+            continue
+
+        key = str(path.relative_to(input_dir))
+        entry = manifest["files"].get(key)
+
+        if entry is None:
+            new_images.append(path)
+
+        elif entry["size"] != path.stat().st_size:
+            print(f"Skipping {key}: changed since it was ingested into {entry['shard']}")
+
+    return new_images
+
+
+def next_shard_index(manifest: dict) -> int:
+    indices = [shard["index"] for shard in manifest["shards"].values()]
+    return max(indices) + 1 if indices else 0
+
+
+def _write_shards(
+    images: List[Path],
+    input_path: Path,
+    output_path: Path,
+    scratch_path: Path,
+    manifest: dict,
+    prefix: str,
+    target: str,
+    shard_size_mb: float,
+    num_shards: Optional[int],
+    workers: Optional[int],
+    quality: int,
+    config: ModelConfig,
+) -> Tuple[Dict[str, int], int]:
+    """
+    Encodes the images into shards under `scratch_path`, records them in the
+    manifest and only then promotes them into `output_path`.
+
+    Returns:
+      Tuple[Dict[str, int], int] - Record count of each promoted shard and
+      the number of images that failed to encode.
+    """
+
+    # Encoded records are staged first so the shards can be sized from the
+    # re-encoded bytes rather than the (much larger) source files
+    staging_path = scratch_path / "staging.records"
+    record_sizes = []
+    record_sources = []
+    failed = 0
+
+    size = (config.width, config.height)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            encode_image,
+            [str(path) for path in images],
+            [size] * len(images),
+            [quality] * len(images),
+            chunksize=16,
+        )
+
+        with tf.io.TFRecordWriter(str(staging_path)) as staging:
+            for path, image, error in results:
+                if image is None:
+                    print(f"Skipping {path}: {error}")
+                    failed += 1
+                    continue
+
+                record = serialize_example(Path(path).stem, image, target)
+                staging.write(record)
+                record_sizes.append(len(record))
+                record_sources.append(path)
+
+    if not record_sizes:
+        return {}, failed
+
+    if num_shards is None:
+        num_shards = math.ceil(sum(record_sizes) / (shard_size_mb * 1024 * 1024))
+
+    num_shards = max(1, min(num_shards, len(record_sizes)))
+    first_index = next_shard_index(manifest)
+
+    # Greedy balancing: each record goes to the shard with the fewest bytes
+    heap = [(0, i) for i in range(num_shards)]
+    assignments = []
+    for record_size in record_sizes:
+        shard_bytes, shard = heapq.heappop(heap)
+        assignments.append(shard)
+        heapq.heappush(heap, (shard_bytes + record_size, shard))
+
+    counts = [0] * num_shards
+    for shard in assignments:
+        counts[shard] += 1
+
+    # Shards are written under temporary names since the final names carry
+    # their record counts
+    tmp_paths = [scratch_path / f"shard{i}.tmp" for i in range(num_shards)]
+    writers = [tf.io.TFRecordWriter(str(path)) for path in tmp_paths]
+
+    try:
+        records = tf.data.TFRecordDataset(str(staging_path)).as_numpy_iterator()
+        for record, shard in zip(records, assignments):
+            writers[shard].write(record)
+
+    finally:
+        for writer in writers:
+            writer.close()
+
+    shard_names = [
+        f"{prefix}{first_index + i:02d}-{counts[i]}.tfrec" for i in range(num_shards)
+    ]
+
+    for i, shard_name in enumerate(shard_names):
+        manifest["shards"][shard_name] = {
+            "index": first_index + i,
+            "records": counts[i],
+        }
+
+    for path, shard in zip(record_sources, assignments):
+        source = Path(path)
+        manifest["files"][str(source.relative_to(input_path))] = {
+            "size": source.stat().st_size,
+            "shard": shard_names[shard],
+        }
+
+    # The manifest is written before the shards are promoted: if promotion
+    # stops halfway, the next run prunes the missing shards and re-ingests
+    # their images, while promoted shards are never ingested twice
+    save_manifest(output_path, manifest)
+
+    for tmp_path, shard_name in zip(tmp_paths, shard_names):
+        os.replace(tmp_path, output_path / shard_name)
+
+    return dict(zip(shard_names, counts)), failed
+
+
+def ingest(
+    input_dir: str,
+    output_dir: str,
+    prefix: str,
+    target: str,
+    shard_size_mb: float = 100.0,
+    num_shards: Optional[int] = None,
+    workers: Optional[int] = None,
+    quality: int = 95,
+    config: ModelConfig = None,
+) -> Dict[str, int]:
+    """
+    Ingests the images of a directory into size-balanced TFRecord shards.
+
+    Images already listed in the output manifest are skipped, so re-running
+    after adding images only writes new shards for the new files.
+
+    Args:
+      input_dir: str - Directory with the source images.
+      output_dir: str - Directory for the shards, e.g. `data/monet_tfrec`.
+      prefix: str - Shard file name prefix, e.g. `monet`.
+      target: str - Value of the `target` feature.
+      shard_size_mb: float - Approximate size of each shard, measured on
+        the re-encoded records.
+      num_shards: Optional[int] - Number of shards, overrides shard_size_mb.
+      workers: Optional[int] - Number of worker processes.
+      quality: int - JPEG quality of the re-encoded images.
+      config: ModelConfig - Provides the target image size.
+
+    Returns:
+      Dict[str, int] - Record count of each shard written by this run.
+    """
+
+    config = config or ModelConfig()
+    input_path = Path(input_dir)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(output_path)
+    prune_missing_shards(output_path, manifest)
+    images = find_new_images(input_path, manifest)
+
+    if not images:
+        print(f"No new images in {input_dir}")
+        return {}
+
+    # Staging and unfinished shards live in a scratch directory inside the
+    # output directory: never matched by the `*.tfrec` training glob, removed
+    # even if the run fails, and on the same filesystem for atomic renames
+    with tempfile.TemporaryDirectory(
+        prefix=f".{prefix}-ingest-", dir=output_path
+    ) as scratch_dir:
+        written, failed = _write_shards(
+            images,
+            input_path,
+            output_path,
+            Path(scratch_dir),
+            manifest,
+            prefix=prefix,
+            target=target,
+            shard_size_mb=shard_size_mb,
+            num_shards=num_shards,
+            workers=workers,
+            quality=quality,
+            config=config,
+        )
+
+    print(
+        f"Wrote {sum(written.values())} records to {len(written)} shards "
+        f"in {output_dir} ({failed} failed)"
+    )
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build training TFRecord shards from an image directory"
+    )
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir", help="e.g. ../data/monet_tfrec")
+    parser.add_argument("--prefix", required=True, help="e.g. monet or photo")
+    parser.add_argument("--target", default=None, help="defaults to the prefix")
+    parser.add_argument("--shard-size-mb", type=float, default=100.0)
+    parser.add_argument("--num-shards", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--quality", type=int, default=95)
+    args = parser.parse_args()
+
+    written = ingest(
+        args.input_dir,
+        args.output_dir,
+        prefix=args.prefix,
+        target=args.target or args.prefix,
+        shard_size_mb=args.shard_size_mb,
+        num_shards=args.num_shards,
+        workers=args.workers,
+        quality=args.quality,
+    )
+
+    for shard_name, count in sorted(written.items()):
+        print(f"{shard_name}: {count} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import tensorflow as tf
 from pathlib import Path
 from datetime import datetime
@@ -6,6 +7,15 @@ from models.cyclegan import CycleGAN
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Train the CycleGAN model")
+    parser.add_argument(
+        "--precision",
+        default="float32",
+        choices=["float32", "mixed_bfloat16", "mixed_float16"],
+        help="dtype policy of the generators and discriminators",
+    )
+    args = parser.parse_args()
+
     gpu_devices = tf.config.experimental.list_physical_devices("GPU")
 
     if gpu_devices:
@@ -20,7 +30,7 @@ def main():
         print("No GPU devices found. Using default strategy.")
 
     config, train_ds, test_ds, steps_per_epoch = setup_training(
-        base_dir="../", batch_size=4
+        base_dir="../", batch_size=4, precision=args.precision
     )
 
     Path("logs/cyclegan").mkdir(parents=True, exist_ok=True)
@@ -11,13 +11,16 @@ class DownsampleBlock(tf.keras.layers.Layer):
             padding="same",
             kernel_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
             use_bias=not apply_norm,
+            dtype=self.dtype_policy,
         )
         
+        # Normalization statistics are kept and emitted in float32
         self.batch_norm = tf.keras.layers.BatchNormalization(
-            gamma_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02)
+            gamma_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
+            dtype="float32",
         ) if apply_norm else None
         
-        self.activation = tf.keras.layers.LeakyReLU(0.2)
+        self.activation = tf.keras.layers.LeakyReLU(0.2, dtype=self.dtype_policy)
 
     def call(self, x, training=True):
         x = self.conv(x)
@@ -38,14 +41,19 @@ class UpsampleBlock(tf.keras.layers.Layer):
             padding="same",
             kernel_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
             use_bias=False,
+            dtype=self.dtype_policy,
         )
         
+        # Normalization statistics are kept and emitted in float32
         self.batch_norm = tf.keras.layers.BatchNormalization(
-            gamma_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02)
+            gamma_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
+            dtype="float32",
         )
         
-        self.dropout = tf.keras.layers.Dropout(0.5) if apply_dropout else None
-        self.activation = tf.keras.layers.ReLU()
+        self.dropout = tf.keras.layers.Dropout(
+            0.5, dtype=self.dtype_policy
+        ) if apply_dropout else None
+        self.activation = tf.keras.layers.ReLU(dtype=self.dtype_policy)
 
     def call(self, x, training=True):
         x = self.conv_transpose(x)
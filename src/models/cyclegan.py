@@ -2,6 +2,7 @@ import tensorflow as tf
 from config import ModelConfig
 from models.generator import Generator
 from models.discriminator import Discriminator
+from models.precision import needs_loss_scaling
 
 
 class CycleGAN(tf.keras.Model):
@@ -26,6 +27,22 @@ class CycleGAN(tf.keras.Model):
         self.disc_X_optimizer = tf.keras.optimizers.Adam(**optimizer_kwargs)
         self.disc_Y_optimizer = tf.keras.optimizers.Adam(**optimizer_kwargs)
 
+        # float16 gradients underflow without dynamic loss scaling
+        self.loss_scaling = needs_loss_scaling(config)
+        if self.loss_scaling:
+            self.gen_G_optimizer = tf.keras.mixed_precision.LossScaleOptimizer(
+                self.gen_G_optimizer
+            )
+            self.gen_F_optimizer = tf.keras.mixed_precision.LossScaleOptimizer(
+                self.gen_F_optimizer
+            )
+            self.disc_X_optimizer = tf.keras.mixed_precision.LossScaleOptimizer(
+                self.disc_X_optimizer
+            )
+            self.disc_Y_optimizer = tf.keras.mixed_precision.LossScaleOptimizer(
+                self.disc_Y_optimizer
+            )
+
         # Loss trackers
         self.gen_G_loss_tracker = tf.keras.metrics.Mean(name="gen_G_loss")
         self.gen_F_loss_tracker = tf.keras.metrics.Mean(name="gen_F_loss")
@@ -120,6 +137,40 @@ class CycleGAN(tf.keras.Model):
         """
         return tf.reduce_mean(tf.abs(real_image - same_image))
 
+    def _scale_loss(self, optimizer, loss):
+        """
+        Scales the loss when the precision policy requires loss scaling.
+
+        Args:
+            optimizer: Optimizer that will apply the gradients.
+            loss: Loss to scale.
+
+        Returns:
+            The loss to differentiate.
+        """
+
+        if not self.loss_scaling:
+            return loss
+
+        return optimizer.get_scaled_loss(loss)
+
+    def _unscale_gradients(self, optimizer, gradients):
+        """
+        Undoes the loss scaling applied by `_scale_loss` on the gradients.
+
+        Args:
+            optimizer: Optimizer that will apply the gradients.
+            gradients: Gradients of the scaled loss.
+
+        Returns:
+            The unscaled gradients.
+        """
+
+        if not self.loss_scaling:
+            return gradients
+
+        return optimizer.get_unscaled_gradients(gradients)
+
     def train_step(self, batch_data):
         if isinstance(batch_data, tuple):
             real_x = batch_data[0]
@@ -175,15 +226,33 @@ class CycleGAN(tf.keras.Model):
             disc_X_loss = self._discriminator_loss(disc_real_x, disc_fake_x)
             disc_Y_loss = self._discriminator_loss(disc_real_y, disc_fake_y)
 
-        # Calculate and apply gradients
-        gen_G_gradients = tape.gradient(
-            total_gen_G_loss, self.gen_G.trainable_variables
+            # Loss scaling (float16 only) must be recorded by the tape
+            scaled_gen_G_loss = self._scale_loss(
+                self.gen_G_optimizer, total_gen_G_loss
+            )
+            scaled_gen_F_loss = self._scale_loss(
+                self.gen_F_optimizer, total_gen_F_loss
+            )
+            scaled_disc_X_loss = self._scale_loss(self.disc_X_optimizer, disc_X_loss)
+            scaled_disc_Y_loss = self._scale_loss(self.disc_Y_optimizer, disc_Y_loss)
+
+        # Calculate gradients
+        gen_G_gradients = self._unscale_gradients(
+            self.gen_G_optimizer,
+            tape.gradient(scaled_gen_G_loss, self.gen_G.trainable_variables),
+        )
+        gen_F_gradients = self._unscale_gradients(
+            self.gen_F_optimizer,
+            tape.gradient(scaled_gen_F_loss, self.gen_F.trainable_variables),
+        )
+        disc_X_gradients = self._unscale_gradients(
+            self.disc_X_optimizer,
+            tape.gradient(scaled_disc_X_loss, self.disc_X.trainable_variables),
         )
-        gen_F_gradients = tape.gradient(
-            total_gen_F_loss, self.gen_F.trainable_variables
+        disc_Y_gradients = self._unscale_gradients(
+            self.disc_Y_optimizer,
+            tape.gradient(scaled_disc_Y_loss, self.disc_Y.trainable_variables),
         )
-        disc_X_gradients = tape.gradient(disc_X_loss, self.disc_X.trainable_variables)
-        disc_Y_gradients = tape.gradient(disc_Y_loss, self.disc_Y.trainable_variables)
 
         # Apply gradients
         self.gen_G_optimizer.apply_gradients(
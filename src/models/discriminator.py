@@ -1,40 +1,48 @@
 import tensorflow as tf
 from models.blocks import DownsampleBlock
+from models.precision import get_policy
 
 
 class Discriminator(tf.keras.Model):
     def __init__(self, config, name="discriminator", **kwargs):
-        super().__init__(name=name, **kwargs)
+        policy = get_policy(config)
+        super().__init__(name=name, dtype=policy, **kwargs)
         self.config = config
 
         self.down_stack = [
-            DownsampleBlock(config.base_filters, apply_norm=False),
-            DownsampleBlock(config.base_filters * 2),
-            DownsampleBlock(config.base_filters * 4),
+            DownsampleBlock(config.base_filters, apply_norm=False, dtype=policy),
+            DownsampleBlock(config.base_filters * 2, dtype=policy),
+            DownsampleBlock(config.base_filters * 4, dtype=policy),
         ]
 
-        self.zero_pad1 = tf.keras.layers.ZeroPadding2D()
+        self.zero_pad1 = tf.keras.layers.ZeroPadding2D(dtype=policy)
         self.conv = tf.keras.layers.Conv2D(
             config.base_filters * 8,
             4,
             strides=1,
             kernel_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
             use_bias=False,
+            dtype=policy,
         )
 
         self.batch_norm = tf.keras.layers.BatchNormalization(
-            gamma_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02)
+            gamma_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
+            dtype="float32",
         )
 
-        self.leaky_relu = tf.keras.layers.LeakyReLU(0.2)
-        self.zero_pad2 = tf.keras.layers.ZeroPadding2D()
+        self.leaky_relu = tf.keras.layers.LeakyReLU(0.2, dtype=policy)
+        self.zero_pad2 = tf.keras.layers.ZeroPadding2D(dtype=policy)
         self.final_conv = tf.keras.layers.Conv2D(
             1,
             4,
             strides=1,
             kernel_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
+            dtype=policy,
         )
 
+        # Logits feed the losses, which are computed in float32
+        self.logits = tf.keras.layers.Activation("linear", dtype="float32")
+
     def call(self, x, training=False):
         for down in self.down_stack:
             x = down(x, training=training)
@@ -45,4 +53,4 @@ class Discriminator(tf.keras.Model):
         x = self.leaky_relu(x)
         x = self.zero_pad2(x)
 
-        return self.final_conv(x)
+        return self.logits(self.final_conv(x))
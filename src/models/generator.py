@@ -1,42 +1,50 @@
 import tensorflow as tf
 from models.blocks import DownsampleBlock, UpsampleBlock
+from models.precision import get_policy
 
 
 class Generator(tf.keras.Model):
     def __init__(self, config, name="generator", **kwargs):
-        super().__init__(name=name, **kwargs)
+        policy = get_policy(config)
+        super().__init__(name=name, dtype=policy, **kwargs)
         self.config = config
 
         self.downsample_stack = [
-            DownsampleBlock(64, 4, apply_norm=False),
-            DownsampleBlock(128, 4),
-            DownsampleBlock(256, 4),
-            DownsampleBlock(512, 4),
-            DownsampleBlock(512, 4),
-            DownsampleBlock(512, 4),
-            DownsampleBlock(512, 4),
-            DownsampleBlock(512, 4),
+            DownsampleBlock(64, 4, apply_norm=False, dtype=policy),
+            DownsampleBlock(128, 4, dtype=policy),
+            DownsampleBlock(256, 4, dtype=policy),
+            DownsampleBlock(512, 4, dtype=policy),
+            DownsampleBlock(512, 4, dtype=policy),
+            DownsampleBlock(512, 4, dtype=policy),
+            DownsampleBlock(512, 4, dtype=policy),
+            DownsampleBlock(512, 4, dtype=policy),
         ]
 
         self.upsample_stack = [
-            UpsampleBlock(512, 4, apply_dropout=True),
-            UpsampleBlock(512, 4, apply_dropout=True),
-            UpsampleBlock(512, 4, apply_dropout=True),
-            UpsampleBlock(512, 4),
-            UpsampleBlock(256, 4),
-            UpsampleBlock(128, 4),
-            UpsampleBlock(64, 4),
+            UpsampleBlock(512, 4, apply_dropout=True, dtype=policy),
+            UpsampleBlock(512, 4, apply_dropout=True, dtype=policy),
+            UpsampleBlock(512, 4, apply_dropout=True, dtype=policy),
+            UpsampleBlock(512, 4, dtype=policy),
+            UpsampleBlock(256, 4, dtype=policy),
+            UpsampleBlock(128, 4, dtype=policy),
+            UpsampleBlock(64, 4, dtype=policy),
         ]
 
+        self.concat = tf.keras.layers.Concatenate(dtype=policy)
+
         self.final_conv = tf.keras.layers.Conv2DTranspose(
             filters=config.channels,
             kernel_size=4,
             strides=2,
             padding="same",
             kernel_initializer=tf.keras.initializers.RandomNormal(0.0, 0.02),
-            activation="tanh",
+            dtype=policy,
         )
 
+        # tanh runs in float32 so generated images always leave the model
+        # in full precision, whatever the compute dtype
+        self.tanh = tf.keras.layers.Activation("tanh", dtype="float32")
+
     def call(self, x, training=False):
         skips = []
         for down in self.downsample_stack:
@@ -47,6 +55,6 @@ class Generator(tf.keras.Model):
 
         for up, skip in zip(self.upsample_stack, skips):
             x = up(x, training=training)
-            x = tf.keras.layers.Concatenate()([x, skip])
+            x = self.concat([x, skip])
 
-        return self.final_conv(x)
+        return self.tanh(self.final_conv(x))
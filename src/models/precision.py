@@ -0,0 +1,43 @@
+import tensorflow as tf
+
+SUPPORTED_PRECISIONS = ("float32", "mixed_bfloat16", "mixed_float16")
+
+
+def get_policy(config) -> tf.keras.mixed_precision.Policy:
+    """
+    Builds the Keras dtype policy described by the config.
+
+    Args:
+        config: ModelConfig - The model configuration.
+
+    Returns:
+        tf.keras.mixed_precision.Policy - The policy the layers should use.
+
+    Raises:
+        ValueError: If the configured precision is not supported.
+    """
+
+    if config.precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(
+            f"Unsupported precision '{config.precision}', "
+            f"expected one of {SUPPORTED_PRECISIONS}"
+        )
+
+    return tf.keras.mixed_precision.Policy(config.precision)
+
+
+def needs_loss_scaling(config) -> bool:
+    """
+    Whether the configured precision needs dynamic loss scaling.
+
+    bfloat16 keeps the float32 exponent range, so only float16 gradients
+    are at risk of underflowing.
+
+    Args:
+        config: ModelConfig - The model configuration.
+
+    Returns:
+        bool - True if the optimizers must be wrapped in a LossScaleOptimizer.
+    """
+
+    return get_policy(config).compute_dtype == "float16"
@@ -6,7 +6,7 @@ from typing import Tuple
 
 
 def setup_training(
-    base_dir=".", batch_size: int = 1
+    base_dir=".", batch_size: int = 1, precision: str = "float32"
 ) -> Tuple[ModelConfig, tf.data.Dataset, tf.data.Dataset, int]:
     """
     Sets up the training pipeline for the CycleGAN model.
@@ -14,12 +14,13 @@ def setup_training(
     Args:
       base_dir (str): The base directory where the data is stored.
       batch_size (int): The batch size to use during training.
+      precision (str): The precision policy of the models (see ModelConfig).
 
     Returns:
       A tuple containing the ModelConfig, training dataset, test dataset, and steps per epoch.
     """
 
-    config = ModelConfig()
+    config = ModelConfig(precision=precision)
 
     data_dir = Path(base_dir) / "data"
     monet_files = tf.io.gfile.glob(str(data_dir / "monet_tfrec" / "*.tfrec"))
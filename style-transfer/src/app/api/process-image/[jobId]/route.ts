@@ -0,0 +1,53 @@
+import { NextResponse } from "next/server"
+import {
+  errorResponse,
+  getJob,
+  getJobResult,
+  uploadToS3,
+} from "@/lib/inference-client"
+
+const JOB_ID_PATTERN = /^[0-9a-f]{32}$/
+
+/**
+ * Returns the status of a style transfer job. Once the job completes, the
+ * result is uploaded to S3 and its URL returned.
+ */
+export async function GET(
+  _request: Request,
+  { params }: { params: Promise<{ jobId: string }> }
+) {
+  const { jobId } = await params
+
+  if (!JOB_ID_PATTERN.test(jobId)) {
+    return NextResponse.json({ error: "Invalid job ID" }, { status: 400 })
+  }
+
+  try {
+    const job = await getJob(jobId)
+
+    if (job.status === "failed") {
+      return NextResponse.json(
+        {
+          error: "Failed to process image",
+          details: job.error || "Style transfer job failed",
+        },
+        { status: 500 }
+      )
+    }
+
+    if (job.status !== "completed") {
+      return NextResponse.json({ success: true, status: job.status })
+    }
+
+    const processedUrl = await uploadToS3(
+      await getJobResult(jobId),
+      `processed/${jobId}.jpg`
+    )
+    console.log("Job result uploaded:", { jobId, processedUrl })
+
+    return NextResponse.json({ success: true, status: job.status, processedUrl })
+  } catch (error: any) {
+    const { status, body } = errorResponse(error)
+    return NextResponse.json(body, { status })
+  }
+}
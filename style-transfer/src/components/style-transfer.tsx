@@ -25,12 +25,23 @@ import { default as NextImage } from "next/image"
 
 interface ProcessRepsonse {
   success: boolean
+  jobId: string
   originalUrl: string
-  processedUrl: string
   error?: string
   details?: string
 }
 
+interface JobResponse {
+  success: boolean
+  status: "queued" | "running" | "completed" | "failed"
+  processedUrl?: string
+  error?: string
+  details?: string
+}
+
+const JOB_POLL_INTERVAL_MS = 1000
+const JOB_MAX_WAIT_MS = 5 * 60 * 1000
+
 export function StyleTransfer() {
   const [originalImage, setOriginalImage] = useState<string | null>(null)
   const [stylizedImage, setStylizedImage] = useState<string | null>(null)
@@ -54,6 +65,29 @@ export function StyleTransfer() {
     return response.json()
   }
 
+  const waitForJob = async (jobId: string): Promise<string> => {
+    const deadline = Date.now() + JOB_MAX_WAIT_MS
+
+    while (Date.now() < deadline) {
+      const response = await fetch(`/api/process-image/${jobId}`)
+      const data: JobResponse = await response.json()
+
+      if (!response.ok) {
+        throw new Error(
+          data.details || data.error || `HTTP error! status: ${response.status}`
+        )
+      }
+
+      if (data.status === "completed" && data.processedUrl) {
+        return data.processedUrl
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+    }
+
+    throw new Error("The image processing took too long. Please try again.")
+  }
+
   const preloadImage = (src: string): Promise<void> => {
     return new Promise((resolve, reject) => {
       const img = new Image()
@@ -104,13 +138,14 @@ export function StyleTransfer() {
       }, 500)
 
       const data = await processImage(formData)
+      const processedUrl = await waitForJob(data.jobId)
       await Promise.all([
         preloadImage(data.originalUrl),
-        preloadImage(data.processedUrl),
+        preloadImage(processedUrl),
       ])
 
       setOriginalImage(data.originalUrl)
-      setStylizedImage(data.processedUrl)
+      setStylizedImage(processedUrl)
       setProgress(100)
 
       toast({
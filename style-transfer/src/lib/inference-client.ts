@@ -0,0 +1,195 @@
+import { S3Client, PutObjectCommand } from "@aws-sdk/client-s3"
+import axios, { AxiosInstance } from "axios"
+import { z } from "zod"
+import FormData from "form-data"
+
+const envSchema = z.object({
+  AWS_REGION: z.string(),
+  AWS_ACCESS_KEY_ID: z.string(),
+  AWS_SECRET_ACCESS_KEY: z.string(),
+  AWS_S3_BUCKET: z.string(),
+  AWS_EC2_PUBLIC_IP: z.string(),
+})
+
+const env = envSchema.parse(process.env)
+const s3Client = new S3Client({
+  region: env.AWS_REGION,
+  credentials: {
+    accessKeyId: env.AWS_ACCESS_KEY_ID,
+    secretAccessKey: env.AWS_SECRET_ACCESS_KEY,
+  },
+})
+
+const apiClient: AxiosInstance = axios.create({
+  timeout: 30000,
+  maxContentLength: Infinity,
+  maxBodyLength: Infinity,
+})
+
+const JOBS_URL = `http://${env.AWS_EC2_PUBLIC_IP}:8000/jobs`
+const TIMEOUT_ERROR_STR =
+  "The image processing took too long. Please try again with a smaller image."
+
+export interface JobStatus {
+  job_id: string
+  status: "queued" | "running" | "completed" | "failed"
+  error?: string | null
+}
+
+/**
+ * Auxiliary function to upload an image to the S3 bucket and
+ * returns the URL of the image in the bucket
+ *
+ * @param buffer: Buffer - The image buffer
+ * @param key: string - The key to store the image in S3
+ * @returns string - The image URL
+ */
+export async function uploadToS3(buffer: Buffer, key: string): Promise<string> {
+  const command = new PutObjectCommand({
+    Bucket: env.AWS_S3_BUCKET,
+    Key: key,
+    Body: buffer,
+    ContentType: "image/jpeg",
+  })
+
+  await s3Client.send(command)
+  return `https://${env.AWS_S3_BUCKET}.s3.${env.AWS_REGION}.amazonaws.com/${key}`
+}
+
+/**
+ * Submits the image to the EC2 instance as a style transfer job.
+ *
+ * @param buffer: Buffer - The image buffer
+ * @param filename: string - The filename of the image
+ * @returns string - The job ID
+ */
+export async function submitJob(
+  buffer: Buffer,
+  filename: string
+): Promise<string> {
+  const formData = new FormData()
+  formData.append("file", buffer, {
+    filename,
+    contentType: "image/jpeg",
+  })
+
+  console.log("Submitting job to EC2:", {
+    url: `${JOBS_URL}/`,
+    bufferSize: buffer.length,
+    filename,
+  })
+
+  const response = await apiClient.post<JobStatus>(`${JOBS_URL}/`, formData, {
+    headers: formData.getHeaders(),
+    validateStatus: (status) => status === 202,
+  })
+
+  console.log("Job accepted:", response.data)
+  return response.data.job_id
+}
+
+/**
+ * Fetches the status of a style transfer job.
+ *
+ * @param jobId: string - The job ID
+ * @returns JobStatus - The job status
+ */
+export async function getJob(jobId: string): Promise<JobStatus> {
+  const response = await apiClient.get<JobStatus>(
+    `${JOBS_URL}/${encodeURIComponent(jobId)}`
+  )
+
+  return response.data
+}
+
+/**
+ * Downloads the result of a completed style transfer job.
+ *
+ * @param jobId: string - The job ID
+ * @returns Buffer - The processed image buffer
+ */
+export async function getJobResult(jobId: string): Promise<Buffer> {
+  const response = await apiClient.get(
+    `${JOBS_URL}/${encodeURIComponent(jobId)}/result`,
+    {
+      headers: { Accept: "image/jpeg" },
+      responseType: "arraybuffer",
+      validateStatus: (status) => status === 200,
+    }
+  )
+
+  if (!response.data || response.data.length === 0) {
+    throw new Error("EC2 returned empty response")
+  }
+
+  return Buffer.from(response.data)
+}
+
+/**
+ * Auxiliary function to handle axios errors and returns the appropriate
+ * responses to common cases.
+ *
+ * @param error: any - The error object
+ * @returns: { status: number, body: { error: string } }
+ */
+export function handleAxiosError(error: any) {
+  if (error.code === "ECONNABORTED") {
+    return {
+      status: 504,
+      body: { error: TIMEOUT_ERROR_STR },
+    }
+  }
+
+  if (error.response) {
+    const responseData = Buffer.isBuffer(error.response.data)
+      ? error.response.data.toString("utf-8")
+      : JSON.stringify(error.response.data)
+
+    return {
+      status: error.response.status,
+      body: { error: responseData },
+    }
+  }
+
+  if (error.request) {
+    return {
+      status: 503,
+      body: { error: "Could not connect to image processing server" },
+    }
+  }
+
+  return {
+    status: 500,
+    body: { error: "Internal server error" },
+  }
+}
+
+/**
+ * Builds the JSON error response of the API routes.
+ *
+ * @param error: any - The error object
+ * @returns: { status: number, body: object }
+ */
+export function errorResponse(error: any) {
+  console.error("Error processing image", {
+    error: error,
+    message: error.message,
+    code: error.code,
+    stack: error.stack,
+  })
+
+  if (axios.isAxiosError(error)) {
+    const errorDetails = handleAxiosError(error)
+    console.log("Axios error details:", errorDetails)
+    return errorDetails
+  }
+
+  return {
+    status: 500,
+    body: {
+      error: "Failed to process image",
+      details: error.message || "Unknown error occurred",
+      requestId: crypto.randomUUID(),
+    },
+  }
+}